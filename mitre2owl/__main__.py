@@ -2,7 +2,10 @@
 
 import argparse
 
-from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from shutil import copyfileobj
+from tempfile import SpooledTemporaryFile
 from urllib.request import urlopen
 from zipfile import ZipFile
 
@@ -19,6 +22,9 @@ DATA = {'CAPEC': 'https://capec.mitre.org/data/xml/capec_latest.xml',
         'CVE': 'https://cve.mitre.org/data/downloads/allitems.xml',
         'CWE': 'https://cwe.mitre.org/data/xml/cwec_latest.xml.zip'}
 TYPE_MAP = {'Attack_Pattern': 'CAPEC', 'Vulnerability': 'CVE', 'Weakness': 'CWE'}
+RELATIONS = ['canAlsoBe', 'canFollow', 'canPrecede', 'childOf', 'peerOf', 'requires', 'startsWith']
+SPOOL_SIZE = 8 << 20 # archives bigger than this are spooled to disk
+CHUNK_SIZE = 1 << 20
 
 
 def join_natural(delimiter, l, last='and'):
@@ -31,6 +37,9 @@ def capitalize(string):
     return string[0].upper() + string[1:]
 
 
+NATURES = {relation: f'indRelatedNatureEnumeration{capitalize(relation)}' for relation in RELATIONS}
+
+
 def patch(schema, kind):
     """Patch a parsed schema"""
     match kind:
@@ -88,16 +97,44 @@ def get_rules(kind):
                       [OPA(f's1 hasRelated{type_} r'), DPA(f'r has{kind}ID id'),
                        DPA('s2 hasID id')],
                       OPA('s1 relatedTo s2')))
-    for relation in ['canAlsoBe', 'canFollow', 'canPrecede', 'childOf', 'peerOf', 'requires',
-                     'startsWith']:
+    for (relation, nature) in NATURES.items():
         rules.append(Rule(relation,
-                          [OPA(f's1 hasRelated{type_} r'),
-                           OPA('r hasNature indRelatedNatureEnumeration' f'{capitalize(relation)}'),
+                          [OPA(f's1 hasRelated{type_} r'), OPA('r', 'hasNature', nature),
                            DPA(f'r has{kind}ID id'), DPA('s2 hasID id')],
                           OPA('s1', relation, 's2')))
     return rules
 
 
+class ArchiveMember:
+    """
+    This class represents an archive member, closing the archive along with it
+    :param member: The member file
+    :param resources: The archive resources, including the member
+    """
+    def __init__(self, member, resources):
+        self.member = member
+        self.resources = resources
+
+    def read(self, size=-1):
+        """
+        Read the member
+        :param size: The maximum number of bytes to read
+        """
+        return self.member.read(size)
+
+    def close(self):
+        """Close the member, the archive and its spool"""
+        self.resources.close()
+
+    def __enter__(self):
+        """Trivial context manager"""
+        return self
+
+    def __exit__(self, *_):
+        """Close everything on exit"""
+        self.close()
+
+
 def fetch(path):
     """Fetch a file locally or remotely, unzipping it if necessary"""
     try:
@@ -105,11 +142,49 @@ def fetch(path):
     except ValueError:
         file = open(path, 'rb')
     if path.endswith('.zip'):
-        with file, ZipFile(BytesIO(file.read())) as zipfile:
-            return BytesIO(zipfile.read(zipfile.infolist()[0]))
+        with ExitStack() as resources: # only kept open if the member can be opened
+            with file:
+                spool = resources.enter_context(SpooledTemporaryFile(max_size=SPOOL_SIZE))
+                copyfileobj(file, spool, CHUNK_SIZE)
+            spool.seek(0)
+            zipfile = resources.enter_context(ZipFile(spool))
+            member = resources.enter_context(zipfile.open(zipfile.infolist()[0]))
+            return ArchiveMember(member, resources.pop_all())
     return file
 
 
+def process(kind, schema_location, data_location):
+    """
+    Build the ontology of a given kind (in its own process)
+    :param kind: The kind to process
+    :param schema_location: The schema location
+    :param data_location: The data location
+    """
+    owl.ID_ATTRIBUTES = frozenset(['ID', 'seq'])
+    owl.NAME_ATTRIBUTES = ['Name', 'name', 'Title', 'Term', 'Entry_Name']
+    owl.NAME_INDEX = {attribute: i for (i, attribute) in enumerate(owl.NAME_ATTRIBUTES)}
+    owl.TYPE_MAP = TYPE_MAP
+
+    # Archives have to be downloaded entirely before being read, so fetch the data while the
+    # schema is being parsed
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending_data = executor.submit(fetch, data_location)
+        try:
+            with fetch(schema_location) as schema:
+                patched = patch(Schema(schema), kind)
+        except KeyboardInterrupt:
+            pending_data.cancel() # do not wait for the data to be fetched
+            raise
+        except Exception:
+            if pending_data.exception() is None: # the fetched data would never be closed
+                pending_data.result().close()
+            raise
+        with (pending_data.result() as data,
+              open(f'{kind}.owx', 'w', encoding='utf8', buffering=CHUNK_SIZE) as owx):
+            ontology = Ontology(kind.lower(), patched.parse(data), rules=get_rules(kind))
+            owx.writelines(ontology.emit_owl())
+
+
 def main():
     """Main mitre2owl logic"""
     parser = argparse.ArgumentParser(description='MITRE to OWL converter',
@@ -137,19 +212,15 @@ def main():
     if len(kinds) == 0:
         parser.error('At least one of CAPEC, CVE or CWE must be processed')
 
-    owl.ID_ATTRIBUTES = ['ID', 'seq']
-    owl.NAME_ATTRIBUTES = ['Name', 'name', 'Title', 'Term', 'Entry_Name']
-    owl.TYPE_MAP = TYPE_MAP
-
-    for kind in kinds:
-        kind_lower = kind.lower()
-        schema = fetch(getattr(args, f'{kind_lower}_schema') or SCHEMAS[kind])
-        data = fetch(getattr(args, f'{kind_lower}_data') or DATA[kind])
-
-        with schema, data, open(f'{kind}.owx', 'w', encoding='utf8') as owx:
-            patched = patch(Schema(schema), kind)
-            owx.write(Ontology(kind_lower, patched.parse(data), rules=get_rules(kind)).emit_owl())
-
+    with ProcessPoolExecutor(max_workers=len(kinds)) as executor:
+        futures = []
+        for kind in kinds:
+            kind_lower = kind.lower()
+            futures.append(executor.submit(process, kind,
+                                           getattr(args, f'{kind_lower}_schema') or SCHEMAS[kind],
+                                           getattr(args, f'{kind_lower}_data') or DATA[kind]))
+        for future in as_completed(futures):
+            future.result()
 
 if __name__ == '__main__':
     main()
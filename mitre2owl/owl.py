@@ -1,6 +1,9 @@
 """This module provides tools to produce OWL ontologies"""
 
 import re
+import sys
+
+from functools import lru_cache, partial
 
 
 PAREN_REGEX = re.compile(r'\s*\(.*?\)')
@@ -11,8 +14,23 @@ REPLACEMENTS = {'#': 'Sharp', '+': 'Plus', '.': 'Dot', '\\': 'Backslash', '&': '
                 '/': 'Or', ':': '', '*': 'Wildcard', '=': 'Equal', '"': '', '%': 'Percent',
                 '<': 'Below', '>': 'Above', '^': ''}
 
-ID_ATTRIBUTES = []
+# Single-quoted text, or any character to replace
+SLUG_REGEX = re.compile(r":\s*'([^']*?)'|" + '|'.join(map(re.escape, REPLACEMENTS)))
+
+
+def _replacer(replacements):
+    """Build a function applying replacements in one pass, surrounding substitutes with spaces"""
+    regex = re.compile('|'.join(map(re.escape, replacements)))
+    subs = {orig: f' {sub} ' for (orig, sub) in replacements.items()}
+    return partial(regex.sub, lambda match: subs[match.group()])
+
+
+_replace_inner = _replacer(INNER_REPLACEMENTS)
+_replace = _replacer(REPLACEMENTS)
+
+ID_ATTRIBUTES = frozenset()
 NAME_ATTRIBUTES = []
+NAME_INDEX = {} # position of each name attribute in NAME_ATTRIBUTES
 TYPE_MAP = {}
 
 
@@ -21,29 +39,27 @@ class ClassAtomException(Exception):
 
 def escape(string):
     """Escape a string"""
+    # Chained replacements beat str.translate, whose multi-character substitutions go through a
+    # Python-level mapping for every character
     return (string.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
                   .replace('"', '&quot;').replace("'", '&#39;').replace('\\', '\\\\'))
 
 
-def _replace(string, replacements):
-    """Apply a sequence of replacements on a string"""
-    for (orig, sub) in replacements.items():
-        string = string.replace(orig, f' {sub} ')
-    return string
-
-
 def _slug_match(match):
-    """Utility function to process single-quoted text"""
-    return f' {_replace(match.group(1), INNER_REPLACEMENTS)} '
+    """Utility function to process single-quoted text and characters to replace"""
+    quoted = match.group(1)
+    if quoted is None:
+        return f' {REPLACEMENTS[match.group()]} '
+    return f' {_replace(_replace_inner(quoted))} '
 
 
+@lru_cache(maxsize=16384)
 def slugify(string, property_=False, individual=False):
     """Generate a slug from a string"""
     if property_:
         string = string.replace('@', '') # dirty hack
     string = PAREN_REGEX.sub('', string)
-    string = re.sub(r":\s*'([^']*?)'", _slug_match, string)
-    string = _replace(string, REPLACEMENTS)
+    string = SLUG_REGEX.sub(_slug_match, string)
     words = DELIMITERS.split(string.strip())
     first_word = words[0]
     first_word = first_word[0].upper() + first_word[1:]
@@ -54,6 +70,24 @@ def slugify(string, property_=False, individual=False):
     return first_word + ''.join(s[0].upper() + s[1:] for s in words[1:] if s)
 
 
+def comments(slug, annotations):
+    """
+    Give the XML/OWL representation of comment annotations
+    :param slug: The annotated entity’s slug
+    :param annotations: The annotations
+    """
+    if not annotations:
+        return ''
+    prefix = f'''
+    <AnnotationAssertion>
+        <AnnotationProperty IRI="http://www.w3.org/2000/01/rdf-schema#comment"/>
+        <IRI>#{slug}</IRI>
+        <Literal>'''
+    suffix = '''</Literal>
+    </AnnotationAssertion>'''
+    return ''.join(prefix + escape(annotation) + suffix for annotation in annotations)
+
+
 def make_name(names, tag):
     """
     Get the most suitable name for an entry
@@ -75,6 +109,8 @@ class Literal:
     :param value: The literal value
     :param class_: The XML type
     """
+    __slots__ = ('class_', 'value')
+
     def __init__(self, value, class_):
         self.class_ = class_
         self.value = value
@@ -98,14 +134,40 @@ class Literal:
         return f'<Literal datatypeIRI="{self.class_.emit_owl()}">{self.format_value()}</Literal>'
 
 
+def _emit_assertion(property_slug, parent_slug, value):
+    """
+    Give the XML/OWL representation of an assertion, or of one per item for lists
+    :param property_slug: The predicate’s slug
+    :param parent_slug: The subject’s slug
+    :param value: The object
+    """
+    if isinstance(value, Literal):
+        return f'''
+    <DataPropertyAssertion>
+        <DataProperty IRI="#{property_slug}"/>
+        <NamedIndividual IRI="#{parent_slug}"/>
+        {value.emit_owl()}
+    </DataPropertyAssertion>'''
+    if isinstance(value, list):
+        return ''.join(_emit_assertion(property_slug, parent_slug, item) for item in value)
+    return f'''
+    <ObjectPropertyAssertion>
+        <ObjectProperty IRI="#{property_slug}"/>
+        <NamedIndividual IRI="#{parent_slug}"/>
+        <NamedIndividual IRI="#{value.slug()}"/>
+    </ObjectPropertyAssertion>''' + value.emit_owl()
+
+
 class Has:
     """
     This class represents an OWL assertion (initialized without a subject)
     :param attribute: The attribute used to create the predicate
     :param value: The object
     """
+    __slots__ = ('attribute', 'value')
+
     def __init__(self, attribute, value):
-        self.attribute = attribute
+        self.attribute = sys.intern(attribute)
         self.value = value
 
     def emit_owl(self, parent_slug):
@@ -113,27 +175,10 @@ class Has:
         Give the XML/OWL representation of the assertion
         :param parent_slug: The subject’s slug
         """
-        owl = ''
-        values = self.value if isinstance(self.value, list) else [self.value]
-        for value in values:
-            if isinstance(value, Literal):
-                owl += f'''
-    <DataPropertyAssertion>
-        <DataProperty IRI="#{slugify(self.attribute, property_=True)}"/>
-        <NamedIndividual IRI="#{parent_slug}"/>
-        {value.emit_owl()}
-    </DataPropertyAssertion>'''
-            else:
-                owl += f'''
-    <ObjectPropertyAssertion>
-        <ObjectProperty IRI="#{slugify(self.attribute, property_=True)}"/>
-        <NamedIndividual IRI="#{parent_slug}"/>
-        <NamedIndividual IRI="#{value.slug()}"/>
-    </ObjectPropertyAssertion>''' + value.emit_owl()
-        return owl
+        return _emit_assertion(slugify(self.attribute, property_=True), parent_slug, self.value)
 
 
-class Individual:
+class Individual: # pylint: disable=R0902
     """
     This class represents an OWL individual
     :param name: The individual name used as a base slug
@@ -142,36 +187,42 @@ class Individual:
     :param annotations: The indidual annotations
     :param ignore: Whether to ignore OWL translation
     """
+    __slots__ = ('assertions', 'id', 'name', 'type', 'slug_base', 'annotations', 'ignore', '_slug')
+
     def __init__(self, name, /, *, assertions=None, type_=None, annotations=None, ignore=False):
-        names = {attribute: None for attribute in NAME_ATTRIBUTES}
+        names = [None]*len(NAME_ATTRIBUTES)
         self.assertions = assertions or []
         self.id = None
         for assertion in self.assertions:
             if assertion.attribute in ID_ATTRIBUTES:
                 self.id = assertion.value.value
                 continue
-            for attribute in NAME_ATTRIBUTES:
-                if assertion.attribute == attribute:
-                    names[attribute] = assertion.value
-        self.name = make_name([names[attribute] for attribute in NAME_ATTRIBUTES], name)
-        self.type = type_
+            i = NAME_INDEX.get(assertion.attribute)
+            if i is not None:
+                names[i] = assertion.value
+        self.name = make_name(names, name)
+        self.type = sys.intern(type_) if type_ is not None else None
         self.slug_base = self.name
         self.annotations = annotations or []
         self.ignore = ignore
+        self._slug = None
 
     def slug(self):
         """Return the Individual’s slug"""
-        if self.id is not None:
-            type_ = TYPE_MAP.get(self.type, self.type)
-            return f'{type_}-{self.id}'
-        return slugify((self.type or '')+self.slug_base, individual=True)
+        if self._slug is None:
+            if self.id is not None:
+                type_ = TYPE_MAP.get(self.type, self.type)
+                self._slug = f'{type_}-{self.id}'
+            else:
+                self._slug = slugify((self.type or '')+self.slug_base, individual=True)
+        return self._slug
 
     def emit_owl(self):
         """Give the XML/OWL representation of the individual"""
         if self.ignore:
             return ''
         slug = self.slug()
-        owl = f'''
+        owl = [f'''
     <Declaration>
         <NamedIndividual IRI="#{slug}"/>
     </Declaration>
@@ -179,21 +230,34 @@ class Individual:
         <AnnotationProperty IRI="http://www.w3.org/2000/01/rdf-schema#label"/>
         <IRI>#{slug}</IRI>
         <Literal>{escape(self.name)}</Literal>
-    </AnnotationAssertion>{''.join(f"""
-    <AnnotationAssertion>
-        <AnnotationProperty IRI="http://www.w3.org/2000/01/rdf-schema#comment"/>
-        <IRI>#{slug}</IRI>
-        <Literal>{escape(annotation)}</Literal>
-    </AnnotationAssertion>""" for annotation in self.annotations)}'''
+    </AnnotationAssertion>{comments(slug, self.annotations)}''']
         if self.type is not None:
-            owl += f'''
+            owl.append(f'''
     <ClassAssertion>
         <Class IRI="#{slugify(self.type)}"/>
         <NamedIndividual IRI="#{slug}"/>
-    </ClassAssertion>'''
-        for assertion in self.assertions:
-            owl += assertion.emit_owl(slug)
-        return owl
+    </ClassAssertion>''')
+        owl.extend(assertion.emit_owl(slug) for assertion in self.assertions)
+        return ''.join(owl)
+
+
+class Reference:
+    """
+    This class represents an already emitted OWL individual, only known by its slug
+    :param slug: The individual’s slug
+    """
+    __slots__ = ('_slug',)
+
+    def __init__(self, slug):
+        self._slug = slug
+
+    def slug(self):
+        """Return the referenced individual’s slug"""
+        return self._slug
+
+    def emit_owl(self):
+        """The individual has already been emitted"""
+        return ''
 
 
 class Class:
@@ -202,6 +266,8 @@ class Class:
     :param type_: The XML type
     :param annotations: The indidual annotations
     """
+    __slots__ = ('type', 'annotations')
+
     def __init__(self, type_, /, *, annotations=None):
         self.type = type_
         self.annotations = annotations or []
@@ -212,12 +278,13 @@ class Class:
         return f'''
     <Declaration>
         <Class IRI="#{slug}"/>
-    </Declaration>{''.join(f"""
-    <AnnotationAssertion>
-        <AnnotationProperty IRI="http://www.w3.org/2000/01/rdf-schema#comment"/>
-        <IRI>#{slug}</IRI>
-        <Literal>{escape(annotation)}</Literal>
-    </AnnotationAssertion>""" for annotation in self.annotations)}'''
+    </Declaration>{comments(slug, self.annotations)}'''
+
+
+@lru_cache(maxsize=None)
+def iri(name):
+    """Make a name relative to the ontology unless it already is an IRI"""
+    return name if '#' in name else f'#{name}'
 
 
 class Property:
@@ -225,6 +292,8 @@ class Property:
     This class represents an OWL property
     :param property__: The RDF triple
     """
+    __slots__ = ('subject', 'predicate', 'object')
+
     def __init__(self, *property_):
         if len(property_) == 1:
             (subject, predicate, object_) = property_[0].split()
@@ -232,9 +301,9 @@ class Property:
             (subject, predicate, object_) = property_
         if predicate == 'a':
             raise ClassAtomException
-        self.subject = subject if '#' in subject else f'#{subject}'
-        self.predicate = predicate if '#' in predicate else f'#{predicate}'
-        self.object = object_ if '#' in object_ else f'#{object_}'
+        self.subject = iri(subject)
+        self.predicate = iri(predicate)
+        self.object = iri(object_)
 
 
 class ClassAtom:
@@ -243,9 +312,11 @@ class ClassAtom:
     :param subject: The RDF subject
     :param class_: The class
     """
+    __slots__ = ('subject', 'class_')
+
     def __init__(self, subject, class_):
-        self.subject = subject if '#' in subject else f'#{subject}'
-        self.class_ = class_ if '#' in class_ else f'#{class_}'
+        self.subject = iri(subject)
+        self.class_ = iri(class_)
 
     def emit_owl(self):
         """Give the XML/OWL representation of the class atom"""
@@ -258,6 +329,8 @@ class ClassAtom:
 
 class ObjectPropertyAtom(Property):
     """This class represents an OWL object property atom"""
+    __slots__ = ()
+
     def emit_owl(self):
         """Give the XML/OWL representation of the object property"""
         return f'''
@@ -270,6 +343,8 @@ class ObjectPropertyAtom(Property):
 
 class DataPropertyAtom(Property):
     """This class represents an OWL data property atom"""
+    __slots__ = ()
+
     def emit_owl(self):
         """Give the XML/OWL representation of the data property"""
         return f'''
@@ -287,6 +362,8 @@ class Rule:
     :param body: The rule body (premises)
     :param head: The rule head (conclusions)
     """
+    __slots__ = ('name', 'body', 'head')
+
     def __init__(self, name, body, head):
         self.name = name
         self.body = body if isinstance(body, list) else [body]
@@ -314,17 +391,17 @@ class Rule:
 class Ontology:
     """
     This class represents an OWL ontology
-    :param entries: The ontology entries (explored recursively)
+    :param entries: The ontology entries (explored recursively, possibly lazily)
     :param rules: The ontology rules
     """
     def __init__(self, kind, entries, rules=None):
         self.kind = kind
-        self.entries = entries if isinstance(entries, list) else [entries]
+        self.entries = entries
         self.rules = rules or []
 
     def emit_owl(self):
-        """Give the XML/OWL representation of the ontology"""
-        return f'''<?xml version="1.0"?>
+        """Give the XML/OWL representation of the ontology, chunk by chunk"""
+        yield f'''<?xml version="1.0"?>
 <Ontology xmlns="http://www.w3.org/2002/07/owl#"
      xml:base="https://owl.caprica-project.org/{self.kind}"
      xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
@@ -338,6 +415,12 @@ class Ontology:
     <Prefix name="xml" IRI="http://www.w3.org/XML/1998/namespace"/>
     <Prefix name="xsd" IRI="http://www.w3.org/2001/XMLSchema#"/>
     <Prefix name="rdfs" IRI="http://www.w3.org/2000/01/rdf-schema#"/>
-    {''.join(entry.emit_owl() for entry in self.entries)}
-    {''.join(rule.emit_owl() for rule in self.rules)}
+    '''
+        for entry in self.entries:
+            yield entry.emit_owl()
+        yield '''
+    '''
+        for rule in self.rules:
+            yield rule.emit_owl()
+        yield '''
 </Ontology>'''
@@ -1,10 +1,15 @@
 "*, annotations=None):""This module provides tools to parse MITRE XML files"""
 
+import sys
+
 from datetime import datetime
+from functools import partial
+from itertools import chain
 from lxml import etree, builder
 
-from .xpathutil import Name, Namespace, xpath
-from .owl import Class, Has, Literal, Individual
+from .xpathutil import Name, Namespace, compile_xpath
+from . import owl
+from .owl import Class, Has, Literal, Individual, Reference
 
 
 class EmptyLiteralException(Exception):
@@ -31,18 +36,41 @@ STRING = XS/'string'
 DATE = XS/'date'
 INTEGER = XS/'integer'
 
+# XPaths evaluated while parsing the schema, compiled once and for all
+ANNOTATIONS = compile_xpath((XS/'annotation') / (XS/'documentation') / 'text()',
+                            smart_strings=False) # plain strings do not keep the schema tree alive
+COMPLEX_TYPES = compile_xpath(XS/COMPLEX_TYPE)
+SIMPLE_TYPES = compile_xpath(XS/SIMPLE_TYPE)
+RESTRICTIONS = compile_xpath(XS/RESTRICTION)
+DEFINITIONS = compile_xpath(XS/(ELEMENT|COMPLEX_TYPE|SIMPLE_TYPE))
+
+ELEMENT_TAG = str(XS/ELEMENT)
+COMPLEX_TYPE_TAG = str(XS/COMPLEX_TYPE)
+SEQUENCE_TAG = str(XS/SEQUENCE)
+CHOICE_TAG = str(XS/CHOICE)
+ANY_TAG = str(XS/ANY)
+ATTRIBUTE_TAG = str(XS/ATTRIBUTE)
+ENUMERATION_TAG = str(XS/ENUMERATION)
+SIMPLE_CONTENT_TAG = str(XS/SIMPLE_CONTENT)
+COMPLEX_CONTENT_TAG = str(XS/COMPLEX_CONTENT)
+EXTENSION_TAG = str(XS/EXTENSION)
+ANNOTATION_TAG = str(XS/'annotation')
+
 
 def get_string(value):
     """Get a string however we can"""
     if isinstance(value, str):
         return value.strip()
-    if value.text is None:
+    text = value.text # every access builds a new string
+    if text is None:
         raise EmptyLiteralException()
-    return value.text.strip()
+    return text.strip()
 
 
 class Skip:
     """This class skips prelude initialization"""
+    __slots__ = ()
+
     @staticmethod
     def init_prelude():
         """Skip the prelude initialization"""
@@ -54,6 +82,8 @@ class String(Literal, Skip):
     :param value: The string
     :param class_: The XML type (xs:string by default)
     """
+    __slots__ = ()
+
     def __init__(self, value, class_=STRING):
         super().__init__(value, class_)
         self.value = get_string(value)
@@ -69,13 +99,24 @@ class Date(Literal, Skip):
     :param value: The date
     :param class_: The XML type (xs:date by default)
     """
+    __slots__ = ()
+
     def __init__(self, value, class_=DATE):
         super().__init__(value, class_)
-        self.value = datetime.strptime(get_string(value), '%Y-%m-%d')
+        string = get_string(value)
+        self.value = None
+        # strptime is pretty slow, but fromisoformat also accepts times, week dates, etc.
+        if len(string) == 10 and string[4] == string[7] == '-' and string[5] != 'W':
+            try:
+                self.value = datetime.fromisoformat(string)
+            except ValueError: # strptime is more lenient with padding and digits
+                pass
+        if self.value is None:
+            self.value = datetime.strptime(string, '%Y-%m-%d')
 
     def format_value(self):
         """Format the date in correct XML"""
-        return datetime.strftime(self.value, "%Y-%m-%d")
+        return self.value.isoformat()[:10]
 
 
 class Integer(Literal, Skip):
@@ -84,6 +125,8 @@ class Integer(Literal, Skip):
     :param value: The integer
     :param class_: The XML type (xs:integer by default)
     """
+    __slots__ = ()
+
     def __init__(self, value, class_=INTEGER):
         super().__init__(value, class_)
         self.value = int(get_string(value))
@@ -98,61 +141,81 @@ class XMLDatePart(Literal, Skip):
     This class represents a date component (gMonth/gDay). Such XML types are pretty weird, so we
     convert them into integers.
     """
+    __slots__ = ()
+
     @staticmethod
     def parse(value, _):
         """
         Parse a date component
         :param value: The date component
         """
-        return Integer(get_string(value).replace('-', ''))
+        return Integer(get_string(value).lstrip('-'))
 
 
-DEFAULT_TYPES = {str(STRING): String,
-                 str(DATE): Date,
-                 str(INTEGER): Integer,
-                 '{http://www.w3.org/2001/XMLSchema}token': String,
-                 '{http://www.w3.org/2001/XMLSchema}anyURI': String,
-                 '{http://www.w3.org/2001/XMLSchema}gYear': Integer,
-                 '{http://www.w3.org/2001/XMLSchema}gMonth': XMLDatePart,
-                 '{http://www.w3.org/2001/XMLSchema}gDay': XMLDatePart}
+# Keys are interned, like the type names built by add_namespace
+DEFAULT_TYPES = {sys.intern(str(name)): type_
+                 for (name, type_) in [(STRING, String),
+                                       (DATE, Date),
+                                       (INTEGER, Integer),
+                                       (XS/'token', String),
+                                       (XS/'anyURI', String),
+                                       (XS/'gYear', Integer),
+                                       (XS/'gMonth', XMLDatePart),
+                                       (XS/'gDay', XMLDatePart)]}
+
+
+to_html = partial(etree.tostring, encoding='unicode', method='html')
+XHTML_MAKER = builder.ElementMaker(namespace=XHTML.ns, nsmap=XHTML.prefixes())
 
 
 def div(text):
     """Create an XHTML div"""
-    return builder.ElementMaker(namespace=XHTML.ns, nsmap=XHTML.prefixes())('div', text)
+    return XHTML_MAKER('div', text)
 
 
 def parse_annotations(node):
-    """Parse the annotations of a node"""
-    return xpath(node, (XS/'annotation') / (XS/'documentation') / 'text()')
+    """Parse the annotations of a node, as a tuple"""
+    if node.find(ANNOTATION_TAG) is None: # most nodes are not documented
+        return ()
+    return tuple(ANNOTATIONS(node))
 
 
 def add_namespace(name, namespace):
     """Add a namespace to a name"""
     if name is None:
         return None
-    return f'{{{namespace}}}{name}'
+    return sys.intern(f'{{{namespace}}}{name}')
 
 
 def parse_type(type_, ns):
     """Parse a type and convert its representation"""
     if type_ is None:
         return None
-    type_components = type_.split(':')
-    if len(type_components) == 1:
-        return add_namespace(type_components[0], ns[0])
-    return add_namespace(type_components[1], ns[1][type_components[0]])
+    colon = type_.find(':')
+    if colon < 0:
+        return sys.intern(f'{{{ns[0]}}}{type_}')
+    return sys.intern(f'{{{ns[1][type_[:colon]]}}}{type_[colon + 1:]}')
+
+
+def group_by_tag(node, *tags):
+    """
+    Group the children of a node by tag, in document order, ignoring other tags
+    :param node: The node whose children to group
+    :param tags: The tags of the groups
+    """
+    groups = {tag: [] for tag in tags}
+    for child in node.iterchildren(*tags):
+        groups[child.tag].append(child)
+    return groups
 
 
-def _merge(first, other):
-    """Merge two choices and ensure type safety properties"""
-    dic = {**first}
+def _merge_into(names, other):
+    """Merge the names of a choice into the given ones and ensure type safety properties"""
     for (name, value) in other.items():
-        if name in first:
-            assert first[name].type == value.type # type safety
+        if (existing := names.get(name)) is not None:
+            assert existing.type == value.type # type safety
         else:
-            dic[name] = value
-    return dic
+            names[name] = value
 
 
 class Element:
@@ -162,6 +225,8 @@ class Element:
     :param schema: The schema
     :param ns: The namespace map
     """
+    __slots__ = ('annotations', 'name', 'min', 'max', 'type', 'resolved', 'names')
+
     def __init__(self, node, schema, ns):
         self.annotations = parse_annotations(node)
         self.name = node.get('name')
@@ -169,31 +234,36 @@ class Element:
         self.max = node.get('maxOccurs')
         self.type = parse_type(node.get('type'), ns)
         if self.type is None: # if the `type' attribute is not set, explore the children
-            complex_types = xpath(node, XS/COMPLEX_TYPE)
+            complex_types = COMPLEX_TYPES(node)
             if complex_types:
                 self.type = ComplexType(complex_types[0], schema, ns, annotations=self.annotations)
             else:
-                self.type = SimpleType(xpath(node, XS/SIMPLE_TYPE)[0], schema, ns)
+                self.type = SimpleType(SIMPLE_TYPES(node)[0], schema, ns)
+        self.resolved = None
         self.names = {add_namespace(self.name, ns[0]): self}
 
     def parse(self, node, schema):
         """
-        [A] Element parser
+        [A] Element parser, always returning a list of assertions
         :param node: The node to parse
         :param schema: The parsed schema
         """
-        type_ = schema.resolve(self.type)
+        type_ = self.resolved or self.resolve(schema)
         parsed = type_.parse(node, schema)
-        name = schema.get_name(node)
+        # The node tag is this element's name, so there is no need to get it from the node
+        name = schema.name_overrides.get(self.name, self.name)
         if type_.alone:
-            assertions = []
-            for assertion in parsed.assertions:
-                if assertion.attribute == '@@value':
-                    assertions.append(Has(name, assertion.value))
-                else:
-                    assertions.append(assertion)
-            return assertions
-        return Has(name, parsed)
+            return [Has(name, assertion.value) if assertion.attribute == '@@value' else assertion
+                    for assertion in parsed.assertions]
+        return [Has(name, parsed)]
+
+    def resolve(self, schema):
+        """
+        Resolve the element type, once the schema is complete
+        :param schema: The parsed schema
+        """
+        self.resolved = schema.resolve(self.type)
+        return self.resolved
 
     def push_annotations(self, annotations):
         """
@@ -212,11 +282,13 @@ class SimpleType(Skip):
     :param ns: The namespace map
     :param name: The optional type name
     """
+    __slots__ = ('name', 'annotations', 'restriction', 'alone', 'marked')
+
     def __init__(self, node, schema, ns, name=None):
         self.name = node.get('name') or name
         self.annotations = parse_annotations(node)
         # For convenience, we ignore lists and unions
-        self.restriction = Restriction(xpath(node, XS/RESTRICTION)[0], schema, ns, self.name)
+        self.restriction = Restriction(RESTRICTIONS(node)[0], schema, ns, self.name)
         self.alone = False # look away
         self.marked = False
 
@@ -240,14 +312,16 @@ class Restriction:
     :param ns: The namespace map
     :param name: The type name
     """
+    __slots__ = ('base', 'individuals', 'name')
+
     def __init__(self, node, schema, ns, name):
         self.base = parse_type(node.get('base'), ns)
-        self.enumerations = {}
+        self.individuals = {} # the ignored individuals referencing each enumeration value
         self.name = name
-        for child in xpath(node, XS/ENUMERATION):
+        for child in node.iterchildren(ENUMERATION_TAG):
             # For convenience, we ignore non-enumeration restrictions
             item = Enumeration(child)
-            self.enumerations[item.value] = item
+            self.individuals[item.value] = item.get(name)
             schema.prelude.append(item.get(name, ignore=False))
 
     def parse(self, node, _):
@@ -255,7 +329,7 @@ class Restriction:
         Restriction parser
         :param node: The node to parse
         """
-        return self.enumerations[get_string(node)].get(self.name)
+        return self.individuals[get_string(node)]
 
 
 class Enumeration:
@@ -263,6 +337,8 @@ class Enumeration:
     [I] xs:enumeration parser
     :param node: The xs:restriction to parse
     """
+    __slots__ = ('value', 'annotations')
+
     def __init__(self, node):
         self.value = node.get('value')
         self.annotations = parse_annotations(node)
@@ -276,7 +352,7 @@ class Enumeration:
         return Individual(self.value, type_=name, annotations=self.annotations, ignore=ignore)
 
 
-class ComplexType:
+class ComplexType: # pylint: disable=R0902
     """
     [I] xs:complexType parser
     :param node: The xs:complexType to parse
@@ -285,17 +361,26 @@ class ComplexType:
     :param name: The parent element name
     :param annotations: The parent element annotations
     """
+    __slots__ = ('name', 'annotations', 'attributes', 'attribute_table', 'type', 'alone',
+                 'force_pushed_annotations_to_relations', 'marked')
+
     def __init__(self, node, schema, ns, *, annotations=None):
         # Here we are VERY lenient with the standard, to simplify parsing
         self.name = node.get('name')
-        self.annotations = (annotations or []) + parse_annotations(node)
-        self.attributes = [Attribute(n, schema, ns) for n in xpath(node, XS/ATTRIBUTE)]
+        self.annotations = (annotations or ()) + parse_annotations(node)
+        groups = group_by_tag(node, ATTRIBUTE_TAG, SEQUENCE_TAG, CHOICE_TAG,
+                              SIMPLE_CONTENT_TAG, COMPLEX_CONTENT_TAG)
+        self.attributes = tuple(Attribute(n, schema, ns) for n in groups[ATTRIBUTE_TAG])
+        self.attribute_table = tuple((attribute.name, attribute) for attribute in self.attributes)
         self.type = None
-        if sequences := xpath(node, XS/SEQUENCE):
+        extensions = [extension
+                      for content in groups[SIMPLE_CONTENT_TAG] + groups[COMPLEX_CONTENT_TAG]
+                      for extension in content.iterchildren(EXTENSION_TAG)]
+        if sequences := groups[SEQUENCE_TAG]:
             self.type = Sequence(sequences[0], schema, ns)
-        elif extensions := xpath(node, (XS/(SIMPLE_CONTENT|COMPLEX_CONTENT)) / (XS/EXTENSION)):
+        elif extensions:
             self.type = Extension(extensions[0], schema, ns)
-        elif choices := xpath(node, XS/CHOICE):
+        elif choices := groups[CHOICE_TAG]:
             self.type = Choice(choices[0], schema, ns)
         if self.type is None:
             self.alone = len(self.attributes) == 1
@@ -316,11 +401,10 @@ class ComplexType:
                 schema.prelude.append(Class(type_, annotations = self.annotations))
             self.marked = True
         assertions = []
-        node_attrs = node.attrib
-        for attribute in self.attributes:
-            name = attribute.name
-            if name in node_attrs:
-                assertions.append(attribute.parse(node_attrs[name], schema))
+        get = node.get
+        for (name, attribute) in self.attribute_table:
+            if (value := get(name)) is not None:
+                assertions.append(attribute.parse(value, schema))
         if self.type is not None:
             assertions += self.type.parse(node, schema)
         return Individual(f'{type_}_{node.sourceline}', assertions=assertions, type_=type_)
@@ -350,12 +434,15 @@ class Attribute:
     :param schema: The schema
     :param ns: The namespace map
     """
+    __slots__ = ('name', 'required', 'type', 'resolved')
+
     def __init__(self, node, schema, ns):
         self.name = node.get('name')
         self.required = node.get('use') == 'required'
         self.type = parse_type(node.get('type'), ns)
         if self.type is None: # if the `type' attribute is not set, explore the children
-            self.type = SimpleType(xpath(node, XS/SIMPLE_TYPE)[0], schema, ns, self.name)
+            self.type = SimpleType(SIMPLE_TYPES(node)[0], schema, ns, self.name)
+        self.resolved = None
 
     def parse(self, value, schema):
         """
@@ -363,7 +450,15 @@ class Attribute:
         :param value: The value to parse
         :param schema: The parsed schema
         """
-        return Has(self.name, schema.resolve(self.type).parse(value, schema))
+        return Has(self.name, (self.resolved or self.resolve(schema)).parse(value, schema))
+
+    def resolve(self, schema):
+        """
+        Resolve the attribute type, once the schema is complete
+        :param schema: The parsed schema
+        """
+        self.resolved = schema.resolve(self.type)
+        return self.resolved
 
     def push_annotations(self, annotations):
         """
@@ -381,11 +476,14 @@ class Sequence:
     :param schema: The schema
     :param ns: The namespace map
     """
+    __slots__ = ('any', 'children', 'alone', 'names')
+
     def __init__(self, node, schema, ns):
         # For convenience, we ignore groups and subsequences
-        elements = [Element(n, schema, ns) for n in xpath(node, XS/ELEMENT)]
-        choices = [Choice(n, schema, ns) for n in xpath(node, XS/CHOICE)]
-        anies = [Any(n) for n in xpath(node, XS/ANY)]
+        groups = group_by_tag(node, ELEMENT_TAG, CHOICE_TAG, ANY_TAG)
+        elements = [Element(n, schema, ns) for n in groups[ELEMENT_TAG]]
+        choices = [Choice(n, schema, ns) for n in groups[CHOICE_TAG]]
+        anies = [Any(n) for n in groups[ANY_TAG]]
         assert len(anies) <= 1
         if anies:
             assert(len(elements) == 0 and len(choices) == 0) # dirty but safe
@@ -393,11 +491,11 @@ class Sequence:
             self.any = anies[0]
         else:
             self.any = None
-        self.children = elements + choices
+        self.children = (*elements, *choices)
         self.alone = len(self.children) <= 1
         self.names = {add_namespace(element.name, ns[0]): element for element in elements}
         for choice in choices:
-            self.names = _merge(self.names, choice.names)
+            _merge_into(self.names, choice.names)
 
     def parse(self, node, schema):
         """
@@ -405,20 +503,12 @@ class Sequence:
         :param node: The node to parse
         :param schema: The parsed schema
         """
-        assertions = []
         if self.any is None:
-            for child in node.xpath('*'):
-                parsed = self.names[child.tag].parse(child, schema)
-                if isinstance(parsed, list): # this is pretty ugly
-                    assertions += parsed
-                else:
-                    assertions.append(parsed)
-        else:
-            text = ((node.text or '') +
-                    ''.join(etree.tostring(child, encoding='unicode', method='html')
-                            for child in node.xpath('*')))
-            assertions.append(self.any.parse(div(text), schema))
-        return assertions
+            names = self.names
+            return list(chain.from_iterable(names[child.tag].parse(child, schema)
+                                            for child in node.iterchildren('*')))
+        text = (node.text or '') + ''.join(map(to_html, node.iterchildren('*')))
+        return [self.any.parse(div(text), schema)]
 
     def push_annotations(self, annotations):
         """
@@ -436,11 +526,15 @@ class Extension:
     :param schema: The schema
     :param ns: The namespace map
     """
+    __slots__ = ('base', 'attributes', 'attribute_table', 'alone', 'resolved_base')
+
     def __init__(self, node, schema, ns):
         self.base = parse_type(node.get('base'), ns)
-        self.attributes = [Attribute(n, schema, ns) for n in xpath(node, XS/ATTRIBUTE)]
+        self.attributes = tuple(Attribute(n, schema, ns) for n in node.iterchildren(ATTRIBUTE_TAG))
+        self.attribute_table = tuple((attribute.name, attribute) for attribute in self.attributes)
         # For convenience, we only consider attribute extensions
         self.alone = False
+        self.resolved_base = None
 
     def parse(self, node, schema):
         """
@@ -449,17 +543,18 @@ class Extension:
         :param schema: The parsed schema
         """
         assertions = []
-        node_attrs = node.attrib
-        for attribute in self.attributes:
-            name = attribute.name
-            if name in node_attrs:
-                assertions.append(attribute.parse(node_attrs[name], schema))
+        get = node.get
+        for (name, attribute) in self.attribute_table:
+            if (value := get(name)) is not None:
+                assertions.append(attribute.parse(value, schema))
         try:
-            parsed = schema.resolve(self.base).parse(node, schema)
+            if self.resolved_base is None:
+                self.resolved_base = schema.resolve(self.base)
+            parsed = self.resolved_base.parse(node, schema)
             if isinstance(parsed, Literal):
                 assertions.append(Has('@@value', parsed))
             else:
-                assertions += parsed.assertions
+                assertions.extend(parsed.assertions)
         except EmptyLiteralException:
             pass
         return assertions
@@ -472,15 +567,18 @@ class Choice:
     :param schema: The schema
     :param ns: The namespace map
     """
+    __slots__ = ('children', 'names', 'alone')
+
     def __init__(self, node, schema, ns):
         # For convenience, we ignore groups, subchoices and anies
-        sequences = [Sequence(n, schema, ns) for n in xpath(node, XS/SEQUENCE)]
-        elements = [Element(n, schema, ns) for n in xpath(node, XS/ELEMENT)]
-        self.children = sequences + elements
+        groups = group_by_tag(node, SEQUENCE_TAG, ELEMENT_TAG)
+        sequences = [Sequence(n, schema, ns) for n in groups[SEQUENCE_TAG]]
+        elements = [Element(n, schema, ns) for n in groups[ELEMENT_TAG]]
+        self.children = (*sequences, *elements)
         self.names = {}
         for choice in self.children:
             # This makes parsing MUCH easier
-            self.names = _merge(self.names, choice.names)
+            _merge_into(self.names, choice.names)
         self.alone = False
 
     def parse(self, node, schema):
@@ -489,14 +587,9 @@ class Choice:
         :param node: The node to parse
         :param schema: The parsed schema
         """
-        assertions = []
-        for child in node.xpath('*'):
-            parsed = self.names[child.tag].parse(child, schema)
-            if isinstance(parsed, list):
-                assertions += parsed
-            else:
-                assertions.append(parsed)
-        return assertions
+        names = self.names
+        return list(chain.from_iterable(names[child.tag].parse(child, schema)
+                                        for child in node.iterchildren('*')))
 
 
 class Any:
@@ -504,6 +597,8 @@ class Any:
     [A] xs:any parser
     :param node: The xs:any to parse
     """
+    __slots__ = ('namespace', 'min', 'max')
+
     def __init__(self, node):
         self.namespace = node.get('namespace')
         self.min = node.get('minOccurs')
@@ -517,13 +612,13 @@ class Any:
         """
         assert etree.QName(node).namespace == self.namespace
         try:
-            value = schema.resolve(node.tag).parse(node, schema)
+            value = schema.types[node.tag].parse(node, schema) # tags are always names
         except KeyError:
             value = schema.raw(node)
         return Has('@@value', value)
 
 
-class Schema:
+class Schema: # pylint: disable=R0902
     """
     XSD parser
     :param file: The xsd file to open
@@ -531,39 +626,96 @@ class Schema:
     """
     def __init__(self, file, raw=None):
         self.elements = {}
-        self.types = {**DEFAULT_TYPES}
+        self.types = DEFAULT_TYPES.copy()
         schema = etree.parse(file).xpath('.')[0]
         self.nsmap = schema.nsmap
         self.namespace = schema.get('targetNamespace')
         self.prelude = []
-        for node in xpath(schema, XS/(ELEMENT|COMPLEX_TYPE|SIMPLE_TYPE)):
-            if XS/ELEMENT == node.tag:
+        for node in DEFINITIONS(schema):
+            if node.tag == ELEMENT_TAG:
                 element = Element(node, self, ns=(self.namespace, self.nsmap))
                 self.elements[add_namespace(element.name, self.namespace)] = element
             else:
-                if XS/COMPLEX_TYPE == node.tag:
+                if node.tag == COMPLEX_TYPE_TAG:
                     Type = ComplexType
                 else:
                     Type = SimpleType
                 type_ = Type(node, self, ns=(self.namespace, self.nsmap))
-                self.types[f'{{{self.namespace}}}{type_.name}'] = type_
+                self.types[add_namespace(type_.name, self.namespace)] = type_
         self.raw_datatypes = raw or [XHTML]
         self.name_overrides = {}
+        self.name_cache = {} # node names by tag, filled while parsing
         for type_ in self.types.values():
             type_.init_prelude()
 
     def parse(self, file):
         """
-        XML parser
+        XML parser, yielding the prelude and the entries as soon as they are complete
         :param file: The XML file to parse
         """
-        node = etree.parse(file).xpath('.')[0]
-        parsed = self.elements[node.tag].parse(node, schema=self)
-        if isinstance(parsed, list):
-            values = [assertion.value for assertion in parsed]
-        else:
-            values = [parsed.value]
-        return self.prelude + values
+        emitted = 0
+        references = []
+        stack = []
+        self.name_cache = {} # name overrides may have changed since the last parse
+        for (event, node) in etree.iterparse(file, events=('start', 'end'), huge_tree=True):
+            if event == 'start':
+                if not stack:
+                    element = self.elements[node.tag]
+                    stack.append((False, element, self._container(element)))
+                    if element.resolved.alone: # the root is dropped, so nothing links records
+                        references = None
+                else:
+                    stack.append(self._stream_item(stack[-1][2], node.tag))
+                continue
+            (record, element, _) = stack.pop()
+            if record:
+                (parsed,) = element.parse(node, self) # records are never alone
+                yield from self.prelude[emitted:]
+                emitted = len(self.prelude)
+                yield parsed.value
+                if references is not None:
+                    references.append(Has(parsed.attribute, Reference(parsed.value.slug())))
+                node.getparent().remove(node)
+            elif not stack:
+                parsed = element.parse(node, self)
+                yield from self.prelude[emitted:]
+                if element.resolved.alone:
+                    yield from (assertion.value for assertion in parsed)
+                else:
+                    (parsed,) = parsed
+                    parsed.value.assertions += references
+                    yield parsed.value
+
+    def _container(self, element):
+        """
+        Return the children names of an element whose children can be streamed, if any
+        :param element: The element parser
+        """
+        type_ = element.resolved or element.resolve(self)
+        if not isinstance(type_, ComplexType):
+            return None
+        if isinstance(type_.type, Choice) or (isinstance(type_.type, Sequence) and
+                                              type_.type.any is None):
+            return type_.type.names
+        return None
+
+    def _stream_item(self, names, tag):
+        """
+        Decide how to stream a node: records are parsed as soon as they end, while the alone
+        types wrapping them are left to their parent
+        :param names: The children names of the parent, if it can be streamed
+        :param tag: The node tag
+        """
+        if names is None:
+            return (False, None, None)
+        element = names[tag]
+        type_ = element.resolved or element.resolve(self)
+        if isinstance(type_, ComplexType):
+            if type_.alone:
+                return (False, element, self._container(element))
+            if element.name not in owl.NAME_ATTRIBUTES:
+                return (True, element, None)
+        return (False, element, None)
 
     def resolve(self, type_):
         """
@@ -579,8 +731,12 @@ class Schema:
         Return the node name or its overriden name
         :param node: The node to process
         """
-        name = Name(node.tag).name
-        return self.name_overrides.get(name, name)
+        tag = node.tag
+        name = self.name_cache.get(tag)
+        if name is None:
+            name = etree.QName(tag).localname
+            name = self.name_cache[tag] = self.name_overrides.get(name, name)
+        return name
 
     def raw(self, node):
         """
@@ -590,6 +746,6 @@ class Schema:
         qname = etree.QName(node)
         for raw_datatype in self.raw_datatypes:
             if qname.namespace == raw_datatype.ns:
-                return String(etree.tostring(node, encoding='unicode', method='html'),
+                return String(to_html(node),
                               raw_datatype/qname.localname)
         assert False # just to be sure
@@ -1,8 +1,7 @@
 """This module provides useful primitives to build and process XPath components"""
 
 
-from functools import reduce
-from lxml.etree import QName
+from lxml.etree import QName, XPath
 
 
 class NoNamespaceException(Exception):
@@ -29,15 +28,20 @@ def prefixes(item):
     return item.prefixes()
 
 
-def _merge(first, other):
-    """Merge two dictionaries"""
-    return {**first, **other}
+def _merge(items):
+    """Merge the prefix maps of several items"""
+    merged = {}
+    for item in items:
+        merged.update(prefixes(item))
+    return merged
 
 
 class Or:
     """This class represents a combination of XPaths"""
     def __init__(self, *args):
         self.operands = args
+        self._prefixed = None # computed on first use, like the prefix map
+        self._prefixes = None
 
     def __or__(self, other):
         """Operator chaining"""
@@ -59,17 +63,23 @@ class Or:
 
     def prefixed(self):
         """Return the prefixed form of the combination"""
-        return '|'.join(map(prefixed, self.operands))
+        if self._prefixed is None:
+            self._prefixed = '|'.join(map(prefixed, self.operands))
+        return self._prefixed
 
     def prefixes(self):
         """Return the prefix map of the combination"""
-        return reduce(_merge, map(prefixes, self.operands))
+        if self._prefixes is None:
+            self._prefixes = _merge(self.operands)
+        return self._prefixes
 
 
 class Path:
     """This class represents an XPath"""
     def __init__(self, *path):
         self.path = path
+        self._prefixed = None # computed on first use, like the prefix map
+        self._prefixes = None
 
     def __truediv__(self, other):
         """Operator chaining"""
@@ -79,11 +89,15 @@ class Path:
 
     def prefixed(self):
         """Return the prefixed XPath"""
-        return '/'.join(map(prefixed, self.path))
+        if self._prefixed is None:
+            self._prefixed = '/'.join(map(prefixed, self.path))
+        return self._prefixed
 
     def prefixes(self):
         """Return the prefix map of the XPath"""
-        return reduce(_merge, map(prefixes, self.path))
+        if self._prefixes is None:
+            self._prefixes = _merge(self.path)
+        return self._prefixes
 
 
 class Name:
@@ -93,9 +107,11 @@ class Name:
             qname = QName(name)
             self.name = qname.localname
             self.namespace = Namespace(None, qname.namespace) # pretty unsafe
+            self._str = name
             return
         self.name = name
         self.namespace = namespace
+        self._str = name if namespace is None else f'{{{namespace.ns}}}{name}'
 
     def __or__(self, other):
         """Build an combination"""
@@ -107,9 +123,7 @@ class Name:
 
     def __str__(self):
         """Return the string representation"""
-        if self.namespace is None:
-            return self.name
-        return f'{{{self.namespace.ns}}}{self.name}'
+        return self._str
 
     def __truediv__(self, other):
         """Build an XPath"""
@@ -117,7 +131,11 @@ class Name:
 
     def __eq__(self, other):
         """Equality"""
-        return str(self) == str(other)
+        return self._str == str(other)
+
+    def __hash__(self):
+        """Hash consistent with the equality"""
+        return hash(self._str)
 
     def prefixed(self):
         """Return the prefixed name"""
@@ -153,6 +171,24 @@ class Namespace:
         return {self.prefix: self.ns}
 
 
+_COMPILED = {} # compiled XPaths, by expression and prefix map
+
+
+def compile_xpath(path, *, smart_strings=True):
+    """
+    Compile an XPath once, so that it can be evaluated many times
+    :param path: The XPath to compile
+    :param smart_strings: Whether string results keep a reference to their parent element
+    """
+    (expression, namespaces) = (prefixed(path), prefixes(path))
+    key = (expression, frozenset(namespaces.items()), smart_strings)
+    compiled = _COMPILED.get(key)
+    if compiled is None:
+        compiled = _COMPILED[key] = XPath(expression, namespaces=namespaces,
+                                          smart_strings=smart_strings)
+    return compiled
+
+
 def xpath(xml, path):
     """`xpath' wrapper"""
-    return xml.xpath(prefixed(path), namespaces=prefixes(path))
+    return compile_xpath(path)(xml)